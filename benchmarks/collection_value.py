@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bot.prices import pack_expected_value, value_collection
+
+RARITIES = np.array(["Common", "Uncommon", "Rare", "Rare Holo", "Rare Ultra", None])
+
+
+def _make_price_frame(rng: np.random.Generator, catalog_size: int, set_count: int):
+    set_ids = rng.integers(0, set_count, catalog_size)
+    prices = rng.lognormal(mean=-0.5, sigma=1.5, size=catalog_size)
+    prices[rng.random(catalog_size) < 0.05] = np.nan
+
+    return pd.DataFrame(
+        {
+            "card_id": [f"card-{i}" for i in range(catalog_size)],
+            "name": [f"Card {i}" for i in range(catalog_size)],
+            "set_id": [f"set-{s}" for s in set_ids],
+            "set_name": [f"Set {s}" for s in set_ids],
+            "rarity": rng.choice(
+                RARITIES, catalog_size, p=[0.45, 0.3, 0.1, 0.07, 0.05, 0.03]
+            ),
+            "price": prices,
+        }
+    ).set_index("card_id")
+
+
+def _make_collection(rng: np.random.Generator, prices: pd.DataFrame, size: int):
+    card_ids = rng.choice(prices.index.to_numpy(), size, replace=False)
+    return pd.DataFrame({"card_id": card_ids, "count": rng.integers(1, 20, size)})
+
+
+def _time(fn, repeat: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return float(np.median(timings)), float(np.max(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collection valuation.")
+    parser.add_argument("--catalog-size", type=int, default=20000)
+    parser.add_argument("--set-count", type=int, default=150)
+    parser.add_argument(
+        "--collection-sizes", type=int, nargs="+", default=[100, 1000, 10000]
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    prices = _make_price_frame(rng, args.catalog_size, args.set_count)
+
+    for size in args.collection_sizes:
+        collection = _make_collection(rng, prices, size)
+        median, worst = _time(lambda: value_collection(collection, prices), args.repeat)
+        print(f"value_collection size={size}: median={median:.2f}ms max={worst:.2f}ms")
+
+    median, worst = _time(lambda: pack_expected_value(prices, "set-0"), args.repeat)
+    print(f"pack_expected_value: median={median:.2f}ms max={worst:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+import pydash
+
+# bot.cogs.pokebox reads the bot config on import; none of it is used here.
+for key, value in {
+    "OWNER_ID": "0",
+    "DISCORD_TOKEN": "benchmark",
+    "POKEMON_TCG_API_KEY": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+from bot.cogs.pokebox import (  # noqa: E402
+    MAX_BOX_SIZE,
+    POKEMON_NAMES,
+    _make_pokemon_box,
+)
+from bot.utils.image_encoder import PRESETS, encode_image  # noqa: E402
+
+
+def _to_bgra(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    if image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    return image
+
+
+def _visual_diff(reference: np.ndarray, data: bytes) -> dict:
+    decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    reference = _to_bgra(reference)
+    decoded = _to_bgra(decoded)
+    if decoded.shape != reference.shape:
+        decoded = cv2.resize(
+            decoded,
+            (reference.shape[1], reference.shape[0]),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    # Fully transparent pixels may legitimately change colour.
+    visible = (reference[..., 3] > 0) | (decoded[..., 3] > 0)
+    diff = np.abs(reference.astype(np.int16) - decoded.astype(np.int16))[visible]
+    mse = float(np.mean(diff.astype(np.float64) ** 2)) if diff.size else 0.0
+    return {
+        "psnr_db": None if mse == 0 else round(10 * np.log10(255**2 / mse), 2),
+        "changed_pixels_pct": round(
+            float(np.mean(np.any(diff > 0, axis=-1))) * 100 if diff.size else 0.0, 3
+        ),
+    }
+
+
+def _bench_preset(boxes: list[np.ndarray], preset_name: str, repeat: int) -> dict:
+    preset = PRESETS[preset_name]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = [encode_image(box, preset) for box in boxes]
+        timings.append((time.perf_counter() - start) * 1000)
+
+    diffs = [_visual_diff(box, e.data) for box, e in zip(boxes, encoded)]
+    psnrs = [d["psnr_db"] for d in diffs if d["psnr_db"] is not None]
+    return {
+        "encode_ms": round(float(np.median(timings)), 3),
+        "bytes": sum(len(e.data) for e in encoded),
+        "min_psnr_db": min(psnrs) if psnrs else None,
+        "max_changed_pixels_pct": max(d["changed_pixels_pct"] for d in diffs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark box image encoding.")
+    parser.add_argument("--box-counts", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    # Boxes are drawn from data/, so run from the repo root like the bot itself.
+    rng = random.Random(args.seed)
+    names = sorted(POKEMON_NAMES)
+    results = {}
+
+    print(
+        f"{'boxes':>5} {'preset':<19}{'encode ms':>10}{'KiB':>10}"
+        f"{'vs png':>8}{'min PSNR':>10}{'changed %':>10}"
+    )
+    for box_count in args.box_counts:
+        pokemon_names = rng.choices(names, k=box_count * MAX_BOX_SIZE)
+        boxes = [
+            _make_pokemon_box(chunk, f"Box: {i}")
+            for i, chunk in enumerate(pydash.chunk(pokemon_names, MAX_BOX_SIZE))
+        ]
+
+        baseline = _bench_preset(boxes, "png", args.repeat)
+        results[box_count] = {}
+        for preset_name in args.presets:
+            stats = _bench_preset(boxes, preset_name, args.repeat)
+            results[box_count][preset_name] = stats
+            psnr = stats["min_psnr_db"]
+            print(
+                f"{box_count:>5} {preset_name:<19}{stats['encode_ms']:>10.1f}"
+                f"{stats['bytes'] / 1024:>10.1f}"
+                f"{stats['bytes'] / baseline['bytes']:>8.2f}"
+                f"{'lossless' if psnr is None else f'{psnr:.1f}':>10}"
+                f"{stats['max_changed_pixels_pct']:>10.2f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from benchmarks.load_test.fake_discord import FakeInteraction, FakeUser, FakeViewMenu
+from benchmarks.load_test.postgres import throwaway_postgres
+from benchmarks.load_test.stub_api import Faults, StubPokemonTCGAPI, make_catalog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = (
+    "set_autocomplete=10,open_pack=5,my_cards=2,collection_value=1,"
+    "pack_value=1,box=1,agent=1"
+)
+LOOP_LAG_INTERVAL = 0.01
+
+
+def _parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, weight = item.split("=")
+        weights[name.strip()] = float(weight)
+
+    return weights
+
+
+def _parse_outage(outage: str) -> tuple[float, float]:
+    start, length = outage.split(":")
+    return float(start), float(length)
+
+
+def _configure_env(
+    api_url: str, database_url: str, tmp_dir: str, write_behind: bool, quota: int
+):
+    os.environ.update(
+        {
+            "POKEMON_TCG_API_URL": api_url,
+            "DATABASE_URL": database_url,
+            "PRICE_TABLE_PATH": os.path.join(tmp_dir, "card_prices.pkl"),
+            "POKEMON_TCG_API_DAILY_QUOTA": str(quota),
+            "WRITE_BEHIND_ENABLED": str(write_behind),
+            "WRITE_BEHIND_JOURNAL_PATH": os.path.join(tmp_dir, "pack_journal.sqlite3"),
+        }
+    )
+    for key, value in {
+        "OWNER_ID": "0",
+        "DISCORD_TOKEN": "loadtest",
+        "POKEMON_TCG_API_KEY": "loadtest",
+        "OPENAI_API_KEY": "loadtest",
+    }.items():
+        os.environ.setdefault(key, value)
+
+
+def _load_bot(llm_latency: float):
+    # The bot reads its config and DATABASE_URL at import time, so it is only
+    # imported once the environment points at the local stubs.
+    import bot.agent.tools.post_images as post_images
+    import bot.cogs.agent as agent_cog
+    import bot.cogs.poketcg as poketcg
+    from benchmarks.load_test.fake_llm import FakeAgentLLM
+    from bot.agent.llm_agent import build_agent
+    from bot.cogs.pokebox import PokeBox
+    from bot.database import engine, metadata
+
+    metadata.create_all(engine)
+
+    poketcg.ViewMenu = FakeViewMenu
+    post_images.ViewMenu = FakeViewMenu
+    agent_cog.agent = build_agent(FakeAgentLLM(latency=llm_latency))
+    agent_cog.agent.verbose = False
+
+    return poketcg, PokeBox(), agent_cog.Agent()
+
+
+def _make_commands(poketcg, pokebox, agent, set_ids: list[str], rng: random.Random):
+    cog = poketcg.PokemonTCGBot(None)
+    prefixes = ["", "s", "stub", "set 1", "stub set 2"]
+
+    commands = {
+        "set_autocomplete": lambda i: poketcg._set_name_autocomplete(
+            i, rng.choice(prefixes)
+        ),
+        "open_pack": lambda i: cog.open_pack.callback(cog, i, rng.choice(set_ids)),
+        "my_cards": lambda i: cog.my_cards.callback(cog, i),
+        "collection_value": lambda i: cog.collection_value.callback(cog, i),
+        "pack_value": lambda i: cog.pack_value.callback(cog, i, rng.choice(set_ids)),
+        "box": lambda i: pokebox.box.callback(
+            pokebox, i, rng.randint(1, 60), None, None
+        ),
+        "agent": lambda i: agent.agent.callback(agent, i, "How many sets are there?"),
+    }
+    return cog, commands
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+
+    ms = np.array(values) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+async def _run_load(commands, mix: dict[str, float], args, users: list[int]):
+    rng = random.Random(args.seed)
+    latencies, loop_lag = defaultdict(list), defaultdict(list)
+    errors, in_flight = Counter(), Counter()
+    discord_latency = args.discord_latency_ms / 1000
+
+    async def invoke(name: str):
+        interaction = FakeInteraction(FakeUser(rng.choice(users)), discord_latency)
+        in_flight[name] += 1
+        start = time.perf_counter()
+        try:
+            await commands[name](interaction)
+        except Exception:
+            errors[name] += 1
+            logger.exception("Command %s failed", name)
+        finally:
+            latencies[name].append(time.perf_counter() - start)
+            in_flight[name] -= 1
+
+    async def monitor_loop_lag(stop: asyncio.Event):
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL)
+            loop_lag["all"].append(lag)
+            for name, count in in_flight.items():
+                if count:
+                    loop_lag[name].append(lag)
+
+    names, weights = list(mix), list(mix.values())
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(stop))
+
+    # Open-loop arrivals: requests are scheduled at the target rate whether or
+    # not earlier ones have finished, like users on a busy server.
+    tasks = []
+    start = time.perf_counter()
+    for n in range(int(args.qps * args.duration)):
+        delay = start + n / args.qps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(invoke(rng.choices(names, weights)[0])))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": len(tasks),
+        "throughput_qps": round(len(tasks) / elapsed, 3),
+        "loop_lag": _percentiles(loop_lag["all"]),
+        "commands": {
+            name: {
+                "requests": len(latencies[name]),
+                "errors": errors[name],
+                "throughput_qps": round(len(latencies[name]) / elapsed, 3),
+                "latency": _percentiles(latencies[name]),
+                "loop_lag": _percentiles(loop_lag[name]),
+            }
+            for name in names
+        },
+    }
+
+
+async def _run(args, stub: StubPokemonTCGAPI):
+    poketcg, pokebox, agent = _load_bot(args.llm_latency_ms / 1000)
+    set_ids = [s["id"] for s in stub.sets]
+    users = list(range(1, args.users + 1))
+    cog, commands = _make_commands(
+        poketcg, pokebox, agent, set_ids, random.Random(args.seed)
+    )
+    mix = _parse_mix(args.mix)
+    if unknown := set(mix) - set(commands):
+        raise ValueError(f"Unknown commands in mix: {sorted(unknown)}")
+
+    await cog.cog_load()
+    try:
+        deadline = time.monotonic() + 60
+        while poketcg.price_table.frame.empty and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        # Warm the API caches so the first requests are not all cold misses.
+        for name in mix:
+            try:
+                await commands[name](FakeInteraction(FakeUser(users[0])))
+            except Exception:
+                logger.exception("Warmup of %s failed", name)
+
+        stub.inject_faults(
+            Faults(
+                rate_limit_rate=args.api_429_rate,
+                retry_after=args.api_retry_after,
+                error_rate=args.api_5xx_rate,
+                outages=[_parse_outage(o) for o in args.api_outage],
+            )
+        )
+        results = await _run_load(commands, mix, args, users)
+        results["api_responses"] = {
+            str(status): count for status, count in sorted(stub.responses.items())
+        }
+        return results
+    finally:
+        await cog.cog_unload()
+
+
+def _print_results(results: dict, baseline: dict | None):
+    print(
+        f"{results['requests']} requests in {results['elapsed_s']}s "
+        f"({results['throughput_qps']} req/s), "
+        f"loop lag p99 {results['loop_lag']['p99_ms']}ms, "
+        f"API responses {results['api_responses']}"
+    )
+    print(
+        f"{'command':<18}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'lag p99':>10}{'p95 vs base':>13}"
+    )
+    for name, stats in results["commands"].items():
+        latency = stats["latency"]
+        change = ""
+        base = (baseline or {}).get("commands", {}).get(name, {}).get("latency", {})
+        if base.get("p95_ms") and latency["p95_ms"] is not None:
+            change = f"{(latency['p95_ms'] / base['p95_ms'] - 1) * 100:+.1f}%"
+
+        print(
+            f"{name:<18}{stats['requests']:>7}{stats['errors']:>6}"
+            f"{latency['p50_ms'] or 0:>10.1f}{latency['p95_ms'] or 0:>10.1f}"
+            f"{latency['p99_ms'] or 0:>10.1f}{stats['loop_lag']['p99_ms'] or 0:>10.1f}"
+            f"{change:>13}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay slash command traffic against local stubs."
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--qps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sets", type=int, default=20)
+    parser.add_argument("--cards-per-set", type=int, default=150)
+    parser.add_argument("--api-latency-ms", type=float, default=50)
+    parser.add_argument(
+        "--api-quota", type=int, default=20000, help="Daily API key quota."
+    )
+    parser.add_argument("--api-429-rate", type=float, default=0.0)
+    parser.add_argument("--api-retry-after", type=float, default=1.0)
+    parser.add_argument("--api-5xx-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--api-outage",
+        action="append",
+        default=[],
+        metavar="START:SECONDS",
+        help="Answer every API request with 503 during this window of the run.",
+    )
+    parser.add_argument("--discord-latency-ms", type=float, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument(
+        "--database-url", help="Use this database instead of a docker postgres."
+    )
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Bot modules log at DEBUG, so filter on the handler rather than the root.
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.WARNING)
+    logging.basicConfig(handlers=[handler])
+
+    sets, cards = make_catalog(args.sets, args.cards_per_set, args.seed)
+    stub = StubPokemonTCGAPI(sets, cards, args.api_latency_ms / 1000)
+    stub.start()
+
+    try:
+        with contextlib.ExitStack() as stack:
+            database_url = args.database_url or stack.enter_context(
+                throwaway_postgres()
+            )
+            tmp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            _configure_env(
+                stub.url, database_url, tmp_dir, args.write_behind, args.api_quota
+            )
+
+            results = asyncio.run(_run(args, stub))
+    finally:
+        stub.stop()
+
+    results["config"] = vars(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    _print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
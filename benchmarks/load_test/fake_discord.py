@@ -0,0 +1,85 @@
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+
+_message_ids = itertools.count(1)
+
+
+@dataclass
+class FakeUser:
+    id: int
+    name: str = "loadtest"
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.name}-{self.id}"
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    kwargs: dict
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+@dataclass
+class SentMessages:
+    latency: float = 0.0
+    messages: list = field(default_factory=list)
+    bytes_sent: int = 0
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        if file := kwargs.get("file"):
+            self.bytes_sent += file.fp.getbuffer().nbytes
+
+        message = FakeMessage(
+            id=next(_message_ids), kwargs={"content": content, **kwargs}
+        )
+        self.messages.append(message)
+        return message
+
+
+class FakeResponse:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._done = True
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeUser, latency: float = 0.0):
+        self.user = user
+        self.response = FakeResponse(latency)
+        self.followup = SentMessages(latency)
+
+
+class FakeViewMenu:
+    # Replaces reactionmenu.ViewMenu, which needs a live gateway to paginate.
+    TypeEmbed = "embed"
+
+    def __init__(self, interaction, menu_type=None, **kwargs):
+        self.interaction = interaction
+        self.pages = []
+
+    def add_page(self, embed):
+        self.pages.append(embed)
+
+    def add_button(self, button):
+        pass
+
+    async def start(self):
+        if self.pages:
+            await self.interaction.followup.send(embed=self.pages[0])
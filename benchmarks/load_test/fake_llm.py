@@ -0,0 +1,35 @@
+import json
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, FunctionMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeAgentLLM(BaseChatModel):
+    # Calls search_sets_tool once, then answers, like a typical set question.
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-agent"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+
+        if isinstance(messages[-1], FunctionMessage):
+            message = AIMessage(
+                content=f"Found {len(json.loads(messages[-1].content or '[]'))} sets."
+            )
+        else:
+            message = AIMessage(
+                content="",
+                additional_kwargs={
+                    "function_call": {
+                        "name": "search_sets_tool",
+                        "arguments": json.dumps({"__arg1": ""}),
+                    }
+                },
+            )
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
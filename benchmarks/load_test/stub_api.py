@@ -0,0 +1,161 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RARITIES = ["Common"] * 6 + ["Uncommon"] * 3 + ["Rare", "Rare Holo", "Rare Ultra"]
+NAMES = ["pikachu", "bulbasaur", "charmander", "squirtle", "eevee", "mewtwo", "snorlax"]
+
+
+def make_catalog(set_count: int, cards_per_set: int, seed: int = 0):
+    rng = random.Random(seed)
+    sets, cards = [], []
+    for s in range(set_count):
+        card_set = {
+            "id": f"set{s}",
+            "name": f"Stub Set {s}",
+            "series": f"Stub Series {s // 10}",
+            "releaseDate": f"20{s % 25:02d}/01/01",
+            "total": cards_per_set,
+        }
+        sets.append(card_set)
+
+        for n in range(1, cards_per_set + 1):
+            price = round(rng.lognormvariate(-0.5, 1.5), 2)
+            cards.append(
+                {
+                    "id": f"set{s}-{n}",
+                    "name": f"{rng.choice(NAMES).capitalize()} {n}",
+                    "rarity": rng.choice(RARITIES),
+                    "types": ["Colorless"],
+                    "number": str(n),
+                    "images": {"small": f"https://images.invalid/set{s}/{n}.png"},
+                    "set": card_set,
+                    "tcgplayer": {"prices": {"normal": {"market": price}}},
+                }
+            )
+
+    return sets, cards
+
+
+def _filter_cards(cards: list[dict], query: str) -> list[dict]:
+    if set_id := re.search(r"set\.id:(\S+)", query):
+        cards = [c for c in cards if c["set"]["id"] == set_id.group(1)]
+    if ids := re.findall(r"(?<![\w.])id:([\w-]+)", query):
+        ids = set(ids)
+        cards = [c for c in cards if c["id"] in ids]
+    if name := re.search(r"(?<![\w.])name:\*?\"?([^*\"\s]+)", query):
+        cards = [c for c in cards if name.group(1).lower() in c["name"].lower()]
+
+    return cards
+
+
+@dataclass
+class Faults:
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    error_rate: float = 0.0
+    # (start, duration) in seconds from when the faults were injected
+    outages: list[tuple[float, float]] = field(default_factory=list)
+    # Statuses answered, in order, before any of the faults above apply
+    scripted: list[int] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    def pick_status(self, rng: random.Random) -> int:
+        if self.scripted:
+            return self.scripted.pop(0)
+
+        elapsed = time.monotonic() - self.started_at
+        if any(start <= elapsed < start + length for start, length in self.outages):
+            return 503
+
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503
+        return 200
+
+
+class StubPokemonTCGAPI:
+    def __init__(self, sets: list[dict], cards: list[dict], latency: float = 0.0):
+        self.sets = sets
+        self.cards = cards
+        self.latency = latency
+        self.faults = Faults()
+        self.responses = Counter()
+        self._rng = random.Random(0)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v2"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(stub.latency)
+
+                status = stub.faults.pick_status(stub._rng)
+                stub.responses[status] += 1
+                if status == 429:
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(stub.faults.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if status != 200:
+                    self.send_error(status)
+                    return
+
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/v2/sets":
+                    data = stub.sets
+                elif url.path == "/v2/cards":
+                    data = _filter_cards(stub.cards, params.get("q", ""))
+                else:
+                    self.send_error(404)
+                    return
+
+                page = int(params.get("page", 1))
+                page_size = int(params.get("pageSize", 250))
+                body = json.dumps(
+                    {
+                        "data": data[(page - 1) * page_size : page * page_size],
+                        "page": page,
+                        "pageSize": page_size,
+                        "totalCount": len(data),
+                    }
+                ).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def inject_faults(self, faults: Faults):
+        self.faults = faults
+        self.responses = Counter()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,12 +1,22 @@
+import asyncio
+import contextvars
+
 import discord
 
-_INTERACTION = None
+# Context variables rather than globals so concurrent /agent calls, each run
+# in its own thread with a copy of the context, see only their own interaction.
+_INTERACTION = contextvars.ContextVar("interaction", default=None)
+_LOOP = contextvars.ContextVar("loop", default=None)
 
 
 def get_interaction() -> discord.Interaction:
-    return _INTERACTION
+    return _INTERACTION.get()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    return _LOOP.get()
 
 
 def set_interaction(interaction: discord.Interaction):
-    global _INTERACTION
-    _INTERACTION = interaction
+    _INTERACTION.set(interaction)
+    _LOOP.set(asyncio.get_running_loop())
@@ -10,15 +10,20 @@ from bot.agent.tools import (
 
 llm = ChatOpenAI(model="gpt-4o", temperature=0)
 
-agent = initialize_agent(
-    tools=[
-        generic_conversation.conversational_tool,
-        pokemon_tcg.search_cards_tool,
-        pokemon_tcg.search_sets_tool,
-        post_images.post_images_tool,
-        post_pokemon_box.create_pokemon_box_tool,
-    ],
-    llm=llm,
-    agent=AgentType.OPENAI_FUNCTIONS,
-    verbose=True,
-)
+
+def build_agent(llm):
+    return initialize_agent(
+        tools=[
+            generic_conversation.conversational_tool,
+            pokemon_tcg.search_cards_tool,
+            pokemon_tcg.search_sets_tool,
+            post_images.post_images_tool,
+            post_pokemon_box.create_pokemon_box_tool,
+        ],
+        llm=llm,
+        agent=AgentType.OPENAI_FUNCTIONS,
+        verbose=True,
+    )
+
+
+agent = build_agent(llm)
@@ -2,15 +2,22 @@ import logging
 from typing import List, Literal
 
 from langchain.tools import StructuredTool, Tool
+from langchain_core.tools import ToolException
 from pydantic import BaseModel, Field
 
-from bot.api.poketcg import PokemonTCGAPI
+from bot.api.poketcg import PokemonTCGAPI, PokemonTCGAPIError
+from bot.api.traffic import Priority
 from bot.config import config
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-pokemon_tcg_api = PokemonTCGAPI(config.pokemon_tcg_api_key)
+pokemon_tcg_api = PokemonTCGAPI(
+    config.pokemon_tcg_api_key,
+    config.pokemon_tcg_api_url,
+    config.pokemon_tcg_api_daily_quota,
+    config.pokemon_tcg_api_burst,
+)
 
 
 # Define the schema for the query input
@@ -86,7 +93,17 @@ def get_cards(
     logger.debug(
         "Running get_cards endpoint with query:%s and select:%s", query, select
     )
-    return pokemon_tcg_api.get_cards(query, ",".join(select))
+    try:
+        return pokemon_tcg_api.get_cards(query, ",".join(select), Priority.AGENT)
+    except PokemonTCGAPIError as e:
+        raise ToolException(str(e)) from e
+
+
+def get_sets(*args, **kwargs):
+    try:
+        return pokemon_tcg_api.get_sets(Priority.AGENT)
+    except PokemonTCGAPIError as e:
+        raise ToolException(str(e)) from e
 
 
 search_cards_tool = StructuredTool(
@@ -102,6 +119,8 @@ search_cards_tool = StructuredTool(
     ),
     args_schema=QuerySchema,
     func=get_cards,
+    # Reported back to the agent, which can rephrase the query or give up.
+    handle_tool_error=True,
 )
 
 
@@ -110,5 +129,6 @@ search_sets_tool = Tool(
     description=(
         "This tool provides generic information about Pokémon card sets. Use this tool to find details such as the total number of sets, the number of sets in each series, the latest set, and which set has the most or fewest cards. It contains general set details and cannot verify if a specific Pokémon card belongs to a particular set. If the details needed by the agent are card-specific, use the other tool instead. This tool uses its best judgment to interpret unclear or misspelled set names and provide accurate information. This tool does not require any input parameters."
     ),
-    func=lambda *args, **kwargs: pokemon_tcg_api.get_sets(),
+    func=get_sets,
+    handle_tool_error=True,
 )
@@ -21,8 +21,10 @@ async def post_images(interaction: discord.Interaction, image_urls: list[str]):
 
 
 def sync_post_images_caller(image_urls: list[str]):
-    loop = asyncio.get_event_loop()
-    loop.create_task(post_images(global_interaction.get_interaction(), image_urls))
+    asyncio.run_coroutine_threadsafe(
+        post_images(global_interaction.get_interaction(), image_urls),
+        global_interaction.get_loop(),
+    )
 
     return "Successfully posted images to channel."
 
@@ -5,14 +5,17 @@ from pydantic import BaseModel
 
 from bot.agent import global_interaction
 from bot.cogs.pokebox import make_pokemon_boxes
+from bot.config import config
 
 
 def sync_make_pokemon_boxes(pokemon_names: str):
-    loop = asyncio.get_event_loop()
-    loop.create_task(
+    asyncio.run_coroutine_threadsafe(
         make_pokemon_boxes(
-            global_interaction.get_interaction(), pokemon_names=pokemon_names
-        )
+            global_interaction.get_interaction(),
+            pokemon_names=pokemon_names,
+            image_presets=config.agent_box_image_presets,
+        ),
+        global_interaction.get_loop(),
     )
     return "Successfully posted pokemon box to channel."
 
@@ -1,50 +1,216 @@
+import email.utils
 import logging
+import random
+import threading
+import time
 
 import requests
-from cachetools import TTLCache, cached
+from cachetools import LRUCache, TTLCache, cached
+
+from bot.api.traffic import CircuitBreaker, Priority, TokenBucket
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 _cache = TTLCache(maxsize=50, ttl=3600)
+_cache_lock = threading.Lock()
+
+# Last good response per request, served while the upstream is unhealthy.
+_stale_cache = LRUCache(maxsize=500)
+_stale_cache_lock = threading.Lock()
+
+# Limiters are shared by every client spending the same API key's quota.
+_limiters = {}
+_limiters_lock = threading.Lock()
+_breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8
+MAX_RETRY_AFTER = 30
+REQUEST_TIMEOUT = 10
+# Overall time budget per request, covering the limiter queue, every attempt
+# and the sleeps between them. Discord drops autocomplete responses after 3s.
+REQUEST_DEADLINE = {
+    Priority.AUTOCOMPLETE: 2,
+    Priority.COMMAND: 30,
+    Priority.AGENT: 60,
+    Priority.BACKGROUND: None,
+}
+
+
+class PokemonTCGAPIError(Exception):
+    pass
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(
+            0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        )
+    except (TypeError, ValueError):
+        return None
 
 
 class PokemonTCGAPI:
-    def __init__(self, api_key: str):
-        self.base_url = "https://api.pokemontcg.io/v2"
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.pokemontcg.io/v2",
+        daily_quota: int = 20000,
+        burst: int = 30,
+    ):
+        self.base_url = base_url.rstrip("/")
         self.headers = {"X-Api-Key": api_key}
 
-    def _make_request(self, method: str, path: str, params: dict = None):
+        with _limiters_lock:
+            if api_key not in _limiters:
+                _limiters[api_key] = TokenBucket(
+                    rate=daily_quota / 86400, capacity=burst
+                )
+            self.limiter = _limiters[api_key]
+
+    def _serve_stale(self, stale_key: tuple, reason: str):
+        with _stale_cache_lock:
+            data = _stale_cache.get(stale_key)
+
+        if data is None:
+            raise PokemonTCGAPIError(f"Pokémon TCG API unavailable: {reason}")
+
+        logger.warning("Serving stale response for %s: %s", stale_key[1], reason)
+        return data
+
+    def _make_request(
+        self,
+        method: str,
+        path: str,
+        params: dict = None,
+        priority: Priority = Priority.COMMAND,
+    ):
         url = f"{self.base_url}/{path.lstrip('/')}"
-        response = requests.request(
-            method=method, url=url, headers=self.headers, params=params, timeout=10
-        )
-        response.raise_for_status()
-        return response.json()
+        stale_key = (method, url, tuple(sorted((params or {}).items())))
+
+        if not _breaker.allow():
+            return self._serve_stale(stale_key, "circuit open")
+
+        deadline = None
+        if REQUEST_DEADLINE[priority] is not None:
+            deadline = time.monotonic() + REQUEST_DEADLINE[priority]
+
+        def remaining() -> float | None:
+            return None if deadline is None else deadline - time.monotonic()
+
+        error = None
+        # Only failures of the upstream itself count towards the breaker, not
+        # 429s or timeouts cut short by this request's own deadline.
+        upstream_failed = False
+        for attempt in range(MAX_RETRIES + 1):
+            if not self.limiter.acquire(priority, timeout=remaining()):
+                return self._serve_stale(stale_key, "rate limited")
 
-    @cached(cache=_cache, key=lambda self: "get_sets")
-    def get_sets(self) -> list[dict]:
+            retry_after = None
+            timeout = REQUEST_TIMEOUT
+            if deadline is not None:
+                timeout = max(0.1, min(REQUEST_TIMEOUT, remaining()))
+
+            try:
+                response = requests.request(
+                    method=method,
+                    url=url,
+                    headers=self.headers,
+                    params=params,
+                    timeout=timeout,
+                )
+            except requests.RequestException as e:
+                error = e
+                upstream_failed = not (
+                    isinstance(e, requests.Timeout) and timeout < REQUEST_TIMEOUT
+                )
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    # Anything else, including other 4xx, means the upstream
+                    # is healthy and retrying would not help.
+                    _breaker.record_success()
+                    try:
+                        response.raise_for_status()
+                    except requests.HTTPError as e:
+                        raise PokemonTCGAPIError(
+                            f"Pokémon TCG API rejected the request: {e}"
+                        ) from e
+
+                    data = response.json()
+                    with _stale_cache_lock:
+                        _stale_cache[stale_key] = data
+                    return data
+
+                error = f"HTTP {response.status_code}"
+                upstream_failed = response.status_code >= 500
+                retry_after = _retry_after(response)
+
+            if attempt == MAX_RETRIES or (retry_after or 0) > MAX_RETRY_AFTER:
+                break
+
+            backoff = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+            delay = max(retry_after or 0, backoff)
+            if deadline is not None and delay >= remaining():
+                break
+
+            logger.debug("Retrying %s in %.2fs after %s", url, delay, error)
+            time.sleep(delay)
+
+        if upstream_failed:
+            _breaker.record_failure()
+        return self._serve_stale(stale_key, str(error))
+
+    @cached(
+        cache=_cache,
+        key=lambda self, priority=Priority.COMMAND: "get_sets",
+        lock=_cache_lock,
+    )
+    def get_sets(self, priority: Priority = Priority.COMMAND) -> list[dict]:
         params = {"select": "id,name,series,releaseDate,total"}
-        response = self._make_request("GET", "/sets", params=params)
+        response = self._make_request("GET", "/sets", params=params, priority=priority)
         return response.get("data", [])
 
-    @cached(cache=_cache, key=lambda self, set_id: f"get_cards_by_set_id:{set_id}")
-    def get_cards_by_set_id(self, set_id: str) -> list[dict]:
+    @cached(
+        cache=_cache,
+        key=lambda self,
+        set_id,
+        priority=Priority.COMMAND: f"get_cards_by_set_id:{set_id}",
+        lock=_cache_lock,
+    )
+    def get_cards_by_set_id(
+        self, set_id: str, priority: Priority = Priority.COMMAND
+    ) -> list[dict]:
         params = {
             "q": f"set.id:{set_id}",
             "select": "id,name,rarity,types,number,images,set",
         }
-        response = self._make_request("GET", "/cards", params=params)
+        response = self._make_request("GET", "/cards", params=params, priority=priority)
         return response.get("data", [])
 
     @cached(
         cache=_cache,
         key=lambda self,
         card_ids,
-        search_name: f"get_cards_by_ids:{','.join(card_ids)}:{search_name}",
+        search_name=None,
+        priority=Priority.COMMAND: f"get_cards_by_ids:{','.join(card_ids)}:{search_name}",
+        lock=_cache_lock,
     )
     def get_cards_by_ids(
-        self, card_ids: list[str], search_name: str = None
+        self,
+        card_ids: list[str],
+        search_name: str = None,
+        priority: Priority = Priority.COMMAND,
     ) -> list[dict]:
         query = "(" + " OR ".join([f"id:{card_id}" for card_id in card_ids]) + ")"
         if search_name:
@@ -52,17 +218,38 @@ class PokemonTCGAPI:
 
         params = {"q": query, "select": "id,name,rarity,types,number,images,small,set"}
 
-        response = self._make_request("GET", "/cards", params=params)
+        response = self._make_request("GET", "/cards", params=params, priority=priority)
         return response.get("data", [])
 
     @cached(
         cache=_cache,
-        key=lambda self, query, select: f"get_cards:{query}.{select}",
+        key=lambda self,
+        query,
+        select,
+        priority=Priority.COMMAND: f"get_cards:{query}.{select}",
+        lock=_cache_lock,
     )
-    def get_cards(self, query: str, select: str) -> list[dict]:
+    def get_cards(
+        self, query: str, select: str, priority: Priority = Priority.COMMAND
+    ) -> list[dict]:
         response = self._make_request(
             "GET",
             "/cards",
             params={"q": query, "select": select},
+            priority=priority,
         )
         return response.get("data", [])
+
+    def get_cards_page(
+        self,
+        select: str,
+        page: int,
+        page_size: int = 250,
+        query: str = None,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> dict:
+        params = {"select": select, "page": page, "pageSize": page_size}
+        if query:
+            params["q"] = query
+
+        return self._make_request("GET", "/cards", params=params, priority=priority)
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    AUTOCOMPLETE = 0
+    COMMAND = 1  # pack opens and other slash command lookups
+    AGENT = 2
+    BACKGROUND = 3
+
+
+LANE_WORKERS = {
+    Priority.AUTOCOMPLETE: 4,
+    Priority.COMMAND: 16,
+    Priority.AGENT: 4,
+    Priority.BACKGROUND: 1,
+}
+
+# One pool per lane so threads blocked on the limiter, or on an LLM round
+# trip, in a low lane cannot starve a higher lane or the default executor.
+_executors = {
+    priority: ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix=f"poketcg-{priority.name.lower()}"
+    )
+    for priority, workers in LANE_WORKERS.items()
+}
+
+
+async def to_lane_thread(lane: Priority, func, *args, **kwargs):
+    # asyncio.to_thread on the lane's pool, so context variables carry over.
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executors[lane], functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+async def run_in_lane(priority: Priority, func, *args):
+    return await to_lane_thread(priority, func, *args, priority=priority)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, priority: Priority, timeout: float | None = None) -> bool:
+        # Waiters are served strictly by priority, then in arrival order, so a
+        # backlog of low priority requests never delays a higher lane.
+        waiter = (priority, next(self._seq))
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    is_next = self._waiters[0] == waiter
+                    if is_next and self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+
+                    wait = (1 - self._tokens) / self.rate if is_next else None
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = min(wait or deadline - now, deadline - now)
+
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            # Half-open: let one trial request through per reset timeout while
+            # everything else keeps failing fast. Failures are not reset until
+            # a success, so a failed trial reopens the circuit.
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_timeout:
+                self._opened_at = now
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
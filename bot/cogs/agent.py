@@ -8,6 +8,7 @@ from langchain_openai import ChatOpenAI
 
 from bot.agent import global_interaction
 from bot.agent.llm_agent import agent
+from bot.api.traffic import Priority, to_lane_thread
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -21,7 +22,10 @@ class Agent(commands.Cog):
         await interaction.response.defer()
         global_interaction.set_interaction(interaction)
 
-        result = agent.invoke({"input": query})
+        # Run the agent in its own lane so its API calls can queue behind
+        # higher priority traffic, and its LLM round trips hold none of the
+        # threads other commands and background tasks run on.
+        result = await to_lane_thread(Priority.AGENT, agent.invoke, {"input": query})
         await interaction.followup.send(
             embed=discord.Embed(
                 description=f"**Input:**\n\n{result['input']}\n\n**Output:**\n\n{pydash.truncate(result['output'], length=1000)}"
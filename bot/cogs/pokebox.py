@@ -1,7 +1,6 @@
 import logging
 import pathlib
 import random
-from io import BytesIO
 
 import cv2
 import discord
@@ -10,6 +9,9 @@ import rapidfuzz
 from discord import app_commands
 from discord.ext import commands
 
+from bot.config import config
+from bot.utils.image_encoder import encode_within_budget
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -60,7 +62,7 @@ def _overlay_box_name(box_index: str, box: cv2.typing.MatLike) -> cv2.typing.Mat
     return box
 
 
-def _make_pokemon_box(pokemon_names: list[str], box_name: str) -> BytesIO:
+def _make_pokemon_box(pokemon_names: list[str], box_name: str) -> cv2.typing.MatLike:
     logger.debug("Creating box: %s with pokemon: %s", box_name, pokemon_names)
     box = cv2.imread("data/storage-bg.png", cv2.IMREAD_UNCHANGED)
     box = _overlay_box_name(box_name, box)
@@ -81,8 +83,7 @@ def _make_pokemon_box(pokemon_names: list[str], box_name: str) -> BytesIO:
             y += int(sprite_width * 0.9)
             i += 1
 
-    _, buffer = cv2.imencode(".png", box)
-    return BytesIO(buffer)
+    return box
 
 
 def _fuzzy_match_pokemon(pokemon_names: list[str]) -> list[str]:
@@ -111,6 +112,7 @@ async def make_pokemon_boxes(
     random_size: int | None = None,
     pokemon_names: str | None = None,
     search_name: str | None = None,
+    image_presets: list[str] | None = None,
 ):
     if not interaction.response.is_done():
         await interaction.response.defer()
@@ -139,11 +141,16 @@ async def make_pokemon_boxes(
         for i, n in enumerate(pydash.chunk(pokemon_names, MAX_BOX_SIZE))
     ]
 
+    # Each box is sent in its own message, so each gets the full upload limit.
     for i, box in enumerate(boxes):
-        file = discord.File(fp=box, filename=f"image_{i}.png")
+        image = encode_within_budget(
+            box, image_presets or config.box_image_presets, config.image_upload_limit
+        )
+        filename = f"image_{i}.{image.extension}"
+        file = discord.File(fp=image.to_file(), filename=filename)
 
         embed = discord.Embed()
-        embed.set_image(url=f"attachment://image_{i}.png")
+        embed.set_image(url=f"attachment://{filename}")
 
         await interaction.followup.send(embed=embed, file=file)
 
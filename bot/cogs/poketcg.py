@@ -1,36 +1,67 @@
+import asyncio
 import logging
 import random
 
 import discord
+import pandas as pd
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from reactionmenu import ViewButton, ViewMenu
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from bot.api.poketcg import PokemonTCGAPI
+from bot.api.poketcg import PokemonTCGAPI, PokemonTCGAPIError
+from bot.api.traffic import Priority, run_in_lane, to_lane_thread
 from bot.config import config
 from bot.database import Session, player_cards
+from bot.prices import (
+    PACK_SLOTS,
+    PriceTable,
+    pack_expected_value,
+    value_collection,
+)
+from bot.write_behind import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-pokeapi = PokemonTCGAPI(config.pokemon_tcg_api_key)
+pokeapi = PokemonTCGAPI(
+    config.pokemon_tcg_api_key,
+    config.pokemon_tcg_api_url,
+    config.pokemon_tcg_api_daily_quota,
+    config.pokemon_tcg_api_burst,
+)
+price_table = PriceTable(config.price_table_path)
+write_behind = (
+    WriteBehindBuffer(config.write_behind_journal_path, config.write_behind_flush_size)
+    if config.write_behind_enabled
+    else None
+)
 
 
 async def _set_name_autocomplete(
     interaction: discord.Interaction,
     current: str,
 ) -> list[app_commands.Choice]:
+    try:
+        sets = await run_in_lane(Priority.AUTOCOMPLETE, pokeapi.get_sets)
+    except PokemonTCGAPIError as e:
+        logger.warning(f"Failed to autocomplete set names: {e}")
+        return []
+
     filtered = [
         app_commands.Choice(name=s["name"], value=s["id"])
-        for s in pokeapi.get_sets()
+        for s in sets
         if current.lower() in s["name"].lower()
     ]
     return filtered[:25]
 
 
 def _upsert_player_cards(user_id: str, card_ids: list[str]):
+    if write_behind:
+        write_behind.append(user_id, card_ids)
+        return
+
     with Session.begin() as session:
         for card_id in card_ids:
             stmt = (
@@ -44,7 +75,7 @@ def _upsert_player_cards(user_id: str, card_ids: list[str]):
             session.execute(stmt)
 
 
-def _get_player_cards(user_id: str) -> tuple[str, int]:
+def _read_player_cards(user_id: str) -> list[tuple[str, int]]:
     with Session.begin() as session:
         stmt = select(player_cards.c.card_id, player_cards.c.count).where(
             player_cards.c.discord_id == user_id
@@ -53,9 +84,78 @@ def _get_player_cards(user_id: str) -> tuple[str, int]:
         return result.fetchall()
 
 
+def _get_player_cards(user_id: str) -> list[tuple[str, int]]:
+    if write_behind:
+        return write_behind.merge_player_cards(
+            user_id, lambda: _read_player_cards(user_id)
+        )
+    return _read_player_cards(user_id)
+
+
 class PokemonTCGBot(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._flush_requested = asyncio.Event()
+
+    async def cog_load(self):
+        await asyncio.to_thread(price_table.load)
+        self.refresh_prices.start()
+
+        if write_behind:
+            await asyncio.to_thread(write_behind.recover)
+            self.flush_write_behind.start()
+
+    async def cog_unload(self):
+        self.refresh_prices.cancel()
+
+        if write_behind:
+            # Let an in-flight flush finish before the final one and close.
+            self.flush_write_behind.stop()
+            self._flush_requested.set()
+            await self.flush_write_behind.get_task()
+            await asyncio.to_thread(write_behind.flush)
+            write_behind.close()
+
+    async def cog_app_command_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError
+    ):
+        # Other errors are still logged by the command tree's own handler.
+        if not isinstance(getattr(error, "original", None), PokemonTCGAPIError):
+            return
+
+        logger.warning(f"Command failed on Pokémon TCG API: {error.original}")
+        await interaction.followup.send(
+            "The Pokémon TCG API is unavailable right now, please try again later."
+        )
+
+    @tasks.loop(seconds=0)
+    async def flush_write_behind(self):
+        # Flushes on the time threshold, or early once open_pack reports the
+        # size threshold. Requests made while a flush runs share the next one.
+        try:
+            await asyncio.wait_for(
+                self._flush_requested.wait(), config.write_behind_flush_seconds
+            )
+        except TimeoutError:
+            pass
+        self._flush_requested.clear()
+
+        try:
+            await asyncio.to_thread(write_behind.flush)
+        except Exception as e:
+            logger.error(f"Failed to flush pack journal: {e}")
+
+    # Checked often and gated on staleness, so a failed refresh is retried at
+    # the next check rather than a full refresh period later.
+    @tasks.loop(minutes=config.price_refresh_check_minutes)
+    async def refresh_prices(self):
+        if not price_table.is_stale(config.price_refresh_hours * 3600):
+            return
+
+        try:
+            await to_lane_thread(Priority.BACKGROUND, price_table.refresh, pokeapi)
+        except Exception as e:
+            logger.error(f"Failed to refresh card prices: {e}")
 
     @app_commands.command(name="open_pack", description="Open a Pokémon booster pack.")
     @app_commands.autocomplete(set_id=_set_name_autocomplete)
@@ -63,7 +163,9 @@ class PokemonTCGBot(commands.Cog):
         await interaction.response.defer()
 
         # Fetch set cards, now including set details in the payload
-        set_cards = pokeapi.get_cards_by_set_id(set_id)
+        set_cards = await run_in_lane(
+            Priority.COMMAND, pokeapi.get_cards_by_set_id, set_id
+        )
 
         if not set_cards:
             await interaction.followup.send("Invalid set ID or no cards found.")
@@ -78,11 +180,25 @@ class PokemonTCGBot(commands.Cog):
 
         # Randomly select cards for the pack
         pack_cards = (
-            (random.choices(common_cards, k=4) if common_cards else [])
-            + (random.choices(uncommon_cards, k=3) if uncommon_cards else [])
-            + (random.choices(rare_cards, k=3) if rare_cards else [])
+            (
+                random.choices(common_cards, k=PACK_SLOTS["Common"])
+                if common_cards
+                else []
+            )
+            + (
+                random.choices(uncommon_cards, k=PACK_SLOTS["Uncommon"])
+                if uncommon_cards
+                else []
+            )
+            + (random.choices(rare_cards, k=PACK_SLOTS["Rare"]) if rare_cards else [])
+        )
+        await asyncio.to_thread(
+            _upsert_player_cards,
+            str(interaction.user.id),
+            [p["id"] for p in pack_cards],
         )
-        _upsert_player_cards(str(interaction.user.id), [p["id"] for p in pack_cards])
+        if write_behind and write_behind.should_flush():
+            self._flush_requested.set()
 
         # Create a menu to display the pack's cards
         menu = ViewMenu(interaction, menu_type=ViewMenu.TypeEmbed)
@@ -118,7 +234,7 @@ class PokemonTCGBot(commands.Cog):
 
         # Default to the interaction user if no user is specified
         user = user or interaction.user
-        user_card_ids = _get_player_cards(str(user.id))
+        user_card_ids = await asyncio.to_thread(_get_player_cards, str(user.id))
 
         if not user_card_ids:
             await interaction.followup.send(f"{user.display_name} has no cards.")
@@ -126,7 +242,9 @@ class PokemonTCGBot(commands.Cog):
 
         # Fetch cards in a single query
         card_ids = [card_id[0] for card_id in user_card_ids]
-        user_cards = pokeapi.get_cards_by_ids(card_ids, filter_name)
+        user_cards = await run_in_lane(
+            Priority.COMMAND, pokeapi.get_cards_by_ids, card_ids, filter_name
+        )
 
         if not user_cards:
             await interaction.followup.send("No cards found with the given filters.")
@@ -156,3 +274,79 @@ class PokemonTCGBot(commands.Cog):
         menu.add_button(ViewButton.back())
         menu.add_button(ViewButton.next())
         await menu.start()
+
+    @app_commands.command(
+        name="collection_value",
+        description="Estimate the market value of a user's collection.",
+    )
+    async def collection_value(
+        self, interaction: discord.Interaction, user: discord.User = None
+    ):
+        await interaction.response.defer()
+
+        user = user or interaction.user
+        user_card_ids = await asyncio.to_thread(_get_player_cards, str(user.id))
+
+        if not user_card_ids:
+            await interaction.followup.send(f"{user.display_name} has no cards.")
+            return
+
+        if price_table.frame.empty:
+            await interaction.followup.send("Card prices are not available yet.")
+            return
+
+        value = value_collection(
+            pd.DataFrame(user_card_ids, columns=["card_id", "count"]),
+            price_table.frame,
+        )
+
+        top_cards = "\n".join(
+            f"{row['name']} ({row['set_name']}) x{row['count']}: ${row['value']:,.2f}"
+            for row in value.top_cards.to_dict("records")
+        )
+        top_sets = "\n".join(
+            f"{set_name}: ${set_value:,.2f}"
+            for set_name, set_value in value.by_set.head(10).items()
+        )
+
+        await interaction.followup.send(
+            embed=discord.Embed(
+                title=f"{user.display_name}'s Collection",
+                description=f"**Total Value**: ${value.total:,.2f}\n"
+                f"**Cards**: {value.card_count} ({value.unpriced_count} without a price)",
+                color=discord.Color.blue(),
+            )
+            .add_field(name="Top Cards", value=top_cards or "N/A", inline=False)
+            .add_field(name="Top Sets", value=top_sets or "N/A", inline=False)
+        )
+
+    @app_commands.command(
+        name="pack_value", description="Estimate the expected value of a booster pack."
+    )
+    @app_commands.autocomplete(set_id=_set_name_autocomplete)
+    async def pack_value(self, interaction: discord.Interaction, set_id: str):
+        await interaction.response.defer()
+
+        if price_table.frame.empty:
+            await interaction.followup.send("Card prices are not available yet.")
+            return
+
+        value = pack_expected_value(price_table.frame, set_id)
+        if not value.card_count:
+            await interaction.followup.send("Invalid set ID or no cards found.")
+            return
+
+        breakdown = "\n".join(
+            f"{PACK_SLOTS[rarity]}x {rarity}: ${rarity_value:,.2f}"
+            for rarity, rarity_value in value.by_rarity.items()
+        )
+
+        await interaction.followup.send(
+            embed=discord.Embed(
+                title="Pack Expected Value",
+                description=f"**Expected Value**: ${value.total:,.2f}\n"
+                f"**Cards**: {value.card_count} ({value.unpriced_count} without a price)"
+                f"\n\n{breakdown}",
+                color=discord.Color.blue(),
+            )
+        )
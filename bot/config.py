@@ -5,6 +5,23 @@ class Settings(BaseSettings):
     owner_id: int
     discord_token: str
     pokemon_tcg_api_key: str
+    pokemon_tcg_api_url: str = "https://api.pokemontcg.io/v2"
+    pokemon_tcg_api_daily_quota: int = 20000
+    pokemon_tcg_api_burst: int = 30
+    price_table_path: str = "data/card_prices.pkl"
+    price_refresh_hours: float = 24
+    price_refresh_check_minutes: float = 5
+    write_behind_enabled: bool = False
+    write_behind_journal_path: str = "data/pack_journal.sqlite3"
+    write_behind_flush_size: int = 500
+    write_behind_flush_seconds: float = 5
+    # Encoder presets from bot.utils.image_encoder.PRESETS: the first is always
+    # used unless it exceeds Discord's attachment size limit per message, then
+    # a fallback is picked by predicted size. "palette" is lossless, and much
+    # smaller than "png" for boxes that fit in 256 colours.
+    box_image_presets: list[str] = ["palette"]
+    agent_box_image_presets: list[str] = ["palette"]
+    image_upload_limit: int = 8 * 1024 * 1024
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -0,0 +1,165 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Cards drawn per rarity bucket by PokemonTCGBot.open_pack.
+PACK_SLOTS = {"Common": 4, "Uncommon": 3, "Rare": 3}
+
+PRICE_COLUMNS = ["name", "set_id", "set_name", "rarity", "price"]
+CATALOG_SELECT = "id,name,rarity,set,tcgplayer,cardmarket"
+
+_TCGPLAYER_VARIANTS = [
+    "normal",
+    "holofoil",
+    "reverseHolofoil",
+    "1stEditionNormal",
+    "1stEditionHolofoil",
+]
+
+
+def _tcgplayer_price(card: dict) -> float | None:
+    prices = (card.get("tcgplayer") or {}).get("prices") or {}
+    variants = [v for v in _TCGPLAYER_VARIANTS if v in prices] + [
+        v for v in prices if v not in _TCGPLAYER_VARIANTS
+    ]
+    for variant in variants:
+        for field in ("market", "mid"):
+            if prices[variant].get(field) is not None:
+                return prices[variant][field]
+
+    return None
+
+
+def _cardmarket_price(card: dict) -> float | None:
+    prices = (card.get("cardmarket") or {}).get("prices") or {}
+    for field in ("trendPrice", "averageSellPrice"):
+        if prices.get(field) is not None:
+            return prices[field]
+
+    return None
+
+
+def _card_price(card: dict) -> float | None:
+    price = _tcgplayer_price(card)
+    return price if price is not None else _cardmarket_price(card)
+
+
+def build_price_frame(cards: list[dict]) -> pd.DataFrame:
+    frame = pd.DataFrame(
+        {
+            "card_id": [c["id"] for c in cards],
+            "name": [c.get("name") for c in cards],
+            "set_id": [c.get("set", {}).get("id") for c in cards],
+            "set_name": [c.get("set", {}).get("name") for c in cards],
+            "rarity": [c.get("rarity") for c in cards],
+            "price": np.array([_card_price(c) for c in cards], dtype=np.float64),
+        }
+    )
+    return frame.drop_duplicates("card_id").set_index("card_id")
+
+
+def rarity_buckets(rarity: pd.Series) -> np.ndarray:
+    return np.where(
+        rarity == "Common",
+        "Common",
+        np.where(rarity == "Uncommon", "Uncommon", "Rare"),
+    )
+
+
+@dataclass
+class CollectionValue:
+    total: float
+    card_count: int
+    unpriced_count: int
+    top_cards: pd.DataFrame
+    by_set: pd.Series
+
+
+@dataclass
+class PackValue:
+    total: float
+    card_count: int
+    unpriced_count: int
+    by_rarity: pd.Series
+
+
+def value_collection(
+    collection: pd.DataFrame, prices: pd.DataFrame, top_n: int = 10
+) -> CollectionValue:
+    merged = collection.join(prices, on="card_id", how="left")
+    merged["value"] = merged["count"].to_numpy() * merged["price"].fillna(0).to_numpy()
+
+    return CollectionValue(
+        total=float(merged["value"].sum()),
+        card_count=int(merged["count"].sum()),
+        unpriced_count=int(merged.loc[merged["price"].isna(), "count"].sum()),
+        top_cards=merged[merged["value"] > 0].nlargest(top_n, "value"),
+        by_set=merged.groupby("set_name")["value"].sum().sort_values(ascending=False),
+    )
+
+
+def pack_expected_value(prices: pd.DataFrame, set_id: str) -> PackValue:
+    # open_pack draws uniformly within each rarity bucket. Unpriced cards are
+    # left out of the averages and reported instead of counted as $0.
+    set_prices = prices[prices["set_id"] == set_id]
+    means = set_prices["price"].groupby(rarity_buckets(set_prices["rarity"])).mean()
+    by_rarity = pd.Series(
+        {bucket: slots * means.get(bucket, 0.0) for bucket, slots in PACK_SLOTS.items()}
+    ).fillna(0)
+    return PackValue(
+        total=float(by_rarity.sum()),
+        card_count=len(set_prices),
+        unpriced_count=int(set_prices["price"].isna().sum()),
+        by_rarity=by_rarity,
+    )
+
+
+def fetch_price_catalog(pokeapi, page_size: int = 250) -> list[dict]:
+    cards, page = [], 1
+    while True:
+        response = pokeapi.get_cards_page(CATALOG_SELECT, page, page_size)
+        cards.extend(response.get("data", []))
+        if not response.get("data") or len(cards) >= response.get("totalCount", 0):
+            return cards
+        page += 1
+
+
+class PriceTable:
+    def __init__(self, path: str):
+        self.path = path
+        self.frame = (
+            pd.DataFrame(columns=PRICE_COLUMNS)
+            .astype({"price": np.float64})
+            .rename_axis("card_id")
+        )
+        self.updated_at = 0.0
+
+    def is_stale(self, max_age: float) -> bool:
+        return time.time() - self.updated_at > max_age
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+
+        self.frame = pd.read_pickle(self.path)
+        self.updated_at = os.path.getmtime(self.path)
+        logger.debug("Loaded %s card prices from %s", len(self.frame), self.path)
+        return True
+
+    def refresh(self, pokeapi):
+        frame = build_price_frame(fetch_price_catalog(pokeapi))
+
+        tmp_path = f"{self.path}.tmp"
+        frame.to_pickle(tmp_path)
+        os.replace(tmp_path, self.path)
+
+        self.frame = frame
+        self.updated_at = time.time()
+        logger.debug("Refreshed %s card prices", len(frame))
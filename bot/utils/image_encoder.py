@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class EncodePreset:
+    format: str = "png"
+    png_compression: int | None = None
+    palette_colors: int | None = None
+    # Quantize images with more colours than the palette instead of falling
+    # back to a full colour PNG.
+    quantize: bool = False
+    scale: float = 1.0
+    # Typical encoded size relative to "png" on boxes, from
+    # benchmarks/image_encoding.py, used to pick a fallback without encoding.
+    size_ratio: float = 1.0
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    extension: str
+
+    def to_file(self) -> BytesIO:
+        return BytesIO(self.data)
+
+
+# "png" matches the old cv2.imencode(".png", ...) output. Palette presets are
+# lossless, falling back to a full colour PNG for images with more colours than
+# the palette, unless they quantize; those and "palette-half" are lossy.
+PRESETS = {
+    "png": EncodePreset(),
+    "png-small": EncodePreset(png_compression=9, size_ratio=0.35),
+    "palette": EncodePreset(palette_colors=256, png_compression=6, size_ratio=0.16),
+    "palette-quantized": EncodePreset(
+        palette_colors=256, png_compression=6, quantize=True, size_ratio=0.16
+    ),
+    "palette-small": EncodePreset(
+        palette_colors=64, png_compression=9, quantize=True, size_ratio=0.15
+    ),
+    "webp": EncodePreset(format="webp", size_ratio=0.14),
+    "png-2x": EncodePreset(png_compression=6, scale=2.0, size_ratio=0.51),
+    "palette-2x": EncodePreset(
+        palette_colors=256, png_compression=6, scale=2.0, size_ratio=0.22
+    ),
+    "palette-half": EncodePreset(
+        palette_colors=256,
+        png_compression=9,
+        quantize=True,
+        scale=0.5,
+        size_ratio=0.09,
+    ),
+}
+
+
+def _resize(image: np.ndarray, scale: float) -> np.ndarray:
+    if scale == 1.0:
+        return image
+
+    # Nearest keeps sprite pixel art crisp when upscaling.
+    interpolation = cv2.INTER_NEAREST if scale > 1 else cv2.INTER_AREA
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def _exact_palette(rgba: np.ndarray, max_colors: int) -> Image.Image | None:
+    colors, indices = np.unique(
+        rgba.reshape(-1, 4).view(np.uint32), return_inverse=True
+    )
+    if len(colors) > max_colors:
+        return None
+
+    palette = colors.view(np.uint8).reshape(-1, 4)
+    image = Image.fromarray(indices.reshape(rgba.shape[:2]).astype(np.uint8), "P")
+    image.putpalette(palette[:, :3].tobytes())
+    if (palette[:, 3] < 255).any():
+        image.info["transparency"] = palette[:, 3].tobytes()
+
+    return image
+
+
+def _encode_palette(image: np.ndarray, preset: EncodePreset) -> bytes | None:
+    if image.ndim == 3 and image.shape[2] == 4:
+        rgba = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    else:
+        rgba = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+
+    # Octree quantization shifts colours even when they fit the palette, so it
+    # is only used for images that don't.
+    paletted = _exact_palette(np.ascontiguousarray(rgba), preset.palette_colors)
+    if paletted is None:
+        if not preset.quantize:
+            return None
+
+        paletted = Image.fromarray(rgba).quantize(
+            colors=preset.palette_colors,
+            method=Image.Quantize.FASTOCTREE,
+            dither=Image.Dither.NONE,
+        )
+
+    buffer = BytesIO()
+    paletted.save(
+        buffer,
+        format="PNG",
+        compress_level=6 if preset.png_compression is None else preset.png_compression,
+    )
+    return buffer.getvalue()
+
+
+def encode_image(image: np.ndarray, preset: EncodePreset) -> EncodedImage:
+    image = _resize(image, preset.scale)
+
+    if preset.format == "webp":
+        # OpenCV switches WebP to lossless for qualities above 100.
+        _, buffer = cv2.imencode(".webp", image, [cv2.IMWRITE_WEBP_QUALITY, 101])
+        return EncodedImage(buffer.tobytes(), "webp")
+
+    if preset.palette_colors:
+        data = _encode_palette(image, preset)
+        if data is not None:
+            return EncodedImage(data, "png")
+
+    params = []
+    if preset.png_compression is not None:
+        params = [cv2.IMWRITE_PNG_COMPRESSION, preset.png_compression]
+
+    _, buffer = cv2.imencode(".png", image, params)
+    return EncodedImage(buffer.tobytes(), "png")
+
+
+def encode_within_budget(
+    image: np.ndarray, preset_names: list[str], max_bytes: int | None = None
+) -> EncodedImage:
+    first, *fallbacks = [PRESETS[preset_name] for preset_name in preset_names]
+    encoded = encode_image(image, first)
+    if max_bytes is None or len(encoded.data) <= max_bytes or not fallbacks:
+        return encoded
+
+    # Rather than encoding every fallback in turn, scale the first result by
+    # each preset's typical size and encode only the first one predicted to
+    # fit, or the smallest if none are.
+    def predicted_size(preset: EncodePreset) -> float:
+        return len(encoded.data) * preset.size_ratio / first.size_ratio
+
+    fallback = next(
+        (preset for preset in fallbacks if predicted_size(preset) <= max_bytes),
+        min(fallbacks, key=predicted_size),
+    )
+    return min(encoded, encode_image(image, fallback), key=lambda e: len(e.data))
@@ -0,0 +1,194 @@
+import logging
+import sqlite3
+import threading
+import uuid
+from collections import Counter, defaultdict
+from typing import Callable
+
+import pydash
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from bot.database import Session, player_cards, write_behind_flushes
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+UPSERT_CHUNK_SIZE = 1000
+
+
+class WriteBehindBuffer:
+    def __init__(self, journal_path: str, flush_size: int):
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Odd while a flush is between its Postgres commit and removing the
+        # flushed counts from _pending.
+        self._flush_generation = 0
+        self._flush_done = threading.Condition(self._lock)
+        self._pending = defaultdict(Counter)
+        self._pending_entries = 0
+
+        self._journal = sqlite3.connect(journal_path, check_same_thread=False)
+        self._journal.execute("PRAGMA journal_mode=WAL")
+        self._journal.execute("PRAGMA synchronous=FULL")
+        with self._journal:
+            self._journal.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._journal.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "discord_id TEXT NOT NULL, card_id TEXT NOT NULL, count INTEGER NOT NULL)"
+            )
+            self._journal.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('journal_id', ?)",
+                (str(uuid.uuid4()),),
+            )
+        self.journal_id = self._journal.execute(
+            "SELECT value FROM meta WHERE key = 'journal_id'"
+        ).fetchone()[0]
+
+    def recover(self):
+        # Entries up to the flush marker already reached Postgres, possibly
+        # right before a crash that left them in the journal.
+        with Session.begin() as session:
+            last_entry_id = session.execute(
+                select(write_behind_flushes.c.last_entry_id).where(
+                    write_behind_flushes.c.journal_id == self.journal_id
+                )
+            ).scalar()
+
+        with self._lock, self._journal:
+            self._journal.execute(
+                "DELETE FROM entries WHERE id <= ?", (last_entry_id or 0,)
+            )
+            rows = self._journal.execute(
+                "SELECT discord_id, card_id, count FROM entries"
+            ).fetchall()
+            for discord_id, card_id, count in rows:
+                self._pending[discord_id][card_id] += count
+            self._pending_entries = len(rows)
+
+        logger.debug("Recovered %s unflushed journal entries", len(rows))
+
+    def append(self, user_id: str, card_ids: list[str]):
+        with self._lock, self._journal:
+            self._journal.executemany(
+                "INSERT INTO entries (discord_id, card_id, count) VALUES (?, ?, 1)",
+                [(user_id, card_id) for card_id in card_ids],
+            )
+            self._pending[user_id].update(card_ids)
+            self._pending_entries += len(card_ids)
+
+    def should_flush(self) -> bool:
+        return self._pending_entries >= self.flush_size
+
+    def merge_player_cards(
+        self, user_id: str, read_rows: Callable[[], list[tuple[str, int]]]
+    ) -> list[tuple[str, int]]:
+        # The Postgres rows and the pending counts must come from the same side
+        # of a flush, or the flushed cards are counted twice or not at all, so
+        # the read is retried if a flush committed while Postgres was queried.
+        while True:
+            with self._flush_done:
+                self._flush_done.wait_for(lambda: self._flush_generation % 2 == 0)
+                generation = self._flush_generation
+
+            rows = read_rows()
+            with self._lock:
+                if self._flush_generation == generation:
+                    pending = dict(self._pending.get(user_id, {}))
+                    break
+
+        if not pending:
+            return rows
+
+        counts = Counter(dict(rows))
+        counts.update(pending)
+        return list(counts.items())
+
+    def flush(self) -> int:
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+
+        try:
+            with self._lock:
+                last_entry_id = self._journal.execute(
+                    "SELECT MAX(id) FROM entries"
+                ).fetchone()[0]
+                if last_entry_id is None:
+                    return 0
+
+                rows = self._journal.execute(
+                    "SELECT discord_id, card_id, SUM(count) FROM entries "
+                    "WHERE id <= ? GROUP BY discord_id, card_id",
+                    (last_entry_id,),
+                ).fetchall()
+                self._flush_generation += 1
+
+            try:
+                self._commit(rows, last_entry_id)
+            except Exception:
+                with self._flush_done:
+                    self._flush_generation += 1
+                    self._flush_done.notify_all()
+                raise
+
+            with self._flush_done, self._journal:
+                self._journal.execute(
+                    "DELETE FROM entries WHERE id <= ?", (last_entry_id,)
+                )
+                for discord_id, card_id, count in rows:
+                    self._pending[discord_id][card_id] -= count
+                    if self._pending[discord_id][card_id] <= 0:
+                        del self._pending[discord_id][card_id]
+                    if not self._pending[discord_id]:
+                        del self._pending[discord_id]
+                self._pending_entries = self._journal.execute(
+                    "SELECT COUNT(*) FROM entries"
+                ).fetchone()[0]
+                self._flush_generation += 1
+                self._flush_done.notify_all()
+
+            logger.debug(
+                "Flushed %s player card rows up to journal entry %s",
+                len(rows),
+                last_entry_id,
+            )
+            return len(rows)
+        finally:
+            self._flush_lock.release()
+
+    def _commit(self, rows: list[tuple[str, str, int]], last_entry_id: int):
+        with Session.begin() as session:
+            for chunk in pydash.chunk(rows, UPSERT_CHUNK_SIZE):
+                stmt = pg_insert(player_cards).values(
+                    [
+                        {
+                            "discord_id": discord_id,
+                            "card_id": card_id,
+                            "count": count,
+                        }
+                        for discord_id, card_id, count in chunk
+                    ]
+                )
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["discord_id", "card_id"],
+                        set_={"count": player_cards.c.count + stmt.excluded.count},
+                    )
+                )
+
+            stmt = pg_insert(write_behind_flushes).values(
+                journal_id=self.journal_id, last_entry_id=last_entry_id
+            )
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["journal_id"],
+                    set_={"last_entry_id": stmt.excluded.last_entry_id},
+                )
+            )
+
+    def close(self):
+        self._journal.close()
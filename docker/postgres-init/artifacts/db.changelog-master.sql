@@ -5,3 +5,10 @@ CREATE TABLE player_cards (
     count INTEGER,
     PRIMARY KEY (discord_id, card_id)
 );
+
+-- changeset author:add-write-behind-flushes
+CREATE TABLE write_behind_flushes (
+    journal_id VARCHAR NOT NULL,
+    last_entry_id BIGINT NOT NULL,
+    PRIMARY KEY (journal_id)
+);
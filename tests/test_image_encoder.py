@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+
+from bot.utils.image_encoder import PRESETS, encode_image, encode_within_budget
+
+
+def _image(colors: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, size=(colors, 4), dtype=np.uint8)
+    palette[:, 3] = rng.choice([128, 255], size=colors)
+    return palette[rng.integers(0, colors, size=(64, 64))]
+
+
+def _decode(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+@pytest.mark.parametrize("colors", [16, 256, 1000])
+def test_palette_is_lossless(colors):
+    image = _image(colors)
+    encoded = encode_image(image, PRESETS["palette"])
+
+    assert encoded.extension == "png"
+    assert np.array_equal(_decode(encoded.data), image)
+
+
+def test_palette_beats_png_when_colours_fit():
+    image = _image(16)
+
+    assert len(encode_image(image, PRESETS["palette"]).data) < len(
+        encode_image(image, PRESETS["png"]).data
+    )
+
+
+def test_quantized_palette_reduces_colours():
+    decoded = _decode(encode_image(_image(1000), PRESETS["palette-quantized"]).data)
+
+    assert len(np.unique(decoded.reshape(-1, decoded.shape[2]), axis=0)) <= 256
+
+
+def test_encode_within_budget_keeps_first_preset_that_fits():
+    image = _image(1000)
+    png = encode_image(image, PRESETS["png"])
+
+    assert encode_within_budget(image, ["png", "palette-half"]).data == png.data
+    assert encode_within_budget(image, ["png"], max_bytes=1).data == png.data
+
+
+def test_encode_within_budget_falls_back_to_predicted_fit():
+    image = _image(1000)
+    png = encode_image(image, PRESETS["png"])
+
+    encoded = encode_within_budget(
+        image, ["png", "png-2x", "palette-half"], max_bytes=len(png.data) // 2
+    )
+
+    assert len(encoded.data) <= len(png.data) // 2
+    assert _decode(encoded.data).shape[:2] == (32, 32)
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from benchmarks.load_test.stub_api import Faults, StubPokemonTCGAPI, make_catalog
+from bot.api import poketcg
+from bot.api.poketcg import PokemonTCGAPI, PokemonTCGAPIError
+from bot.api.traffic import (
+    CircuitBreaker,
+    Priority,
+    TokenBucket,
+    run_in_lane,
+    to_lane_thread,
+)
+
+SETS_PARAMS = {"select": "id,name,series,releaseDate,total"}
+
+
+@pytest.fixture
+def stub():
+    stub = StubPokemonTCGAPI(*make_catalog(set_count=2, cards_per_set=5))
+    stub.start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def api(stub, monkeypatch):
+    poketcg._cache.clear()
+    poketcg._stale_cache.clear()
+    poketcg._limiters.clear()
+    monkeypatch.setattr(poketcg, "_breaker", CircuitBreaker(2, reset_timeout=60))
+    monkeypatch.setattr(poketcg, "BACKOFF_BASE", 0)
+    return PokemonTCGAPI("test", stub.url, daily_quota=86400 * 1000, burst=100)
+
+
+def test_retries_after_retry_after(api, stub):
+    stub.inject_faults(Faults(retry_after=0.3, scripted=[429]))
+
+    start = time.monotonic()
+    sets = api.get_sets()
+
+    assert time.monotonic() - start >= 0.3
+    assert sets == stub.sets
+    assert stub.responses == {429: 1, 200: 1}
+
+
+def test_retries_server_errors(api, stub):
+    stub.inject_faults(Faults(scripted=[503, 503]))
+
+    assert api.get_sets() == stub.sets
+    assert stub.responses == {503: 2, 200: 1}
+
+
+def test_client_errors_raise_without_retrying(api, stub, monkeypatch):
+    monkeypatch.setattr(poketcg, "_breaker", CircuitBreaker(1, reset_timeout=60))
+    stub.inject_faults(Faults(scripted=[400]))
+
+    with pytest.raises(PokemonTCGAPIError, match="rejected"):
+        api.get_cards("name:(", "id")
+
+    assert stub.responses == {400: 1}
+    assert not poketcg._breaker.is_open
+
+
+def test_open_breaker_serves_stale_data(api, stub, monkeypatch):
+    monkeypatch.setattr(poketcg, "MAX_RETRIES", 0)
+    fresh = api._make_request("GET", "/sets", params=SETS_PARAMS)
+
+    stub.inject_faults(Faults(outages=[(0, 60)]))
+    assert api._make_request("GET", "/sets", params=SETS_PARAMS) == fresh
+    assert api._make_request("GET", "/sets", params=SETS_PARAMS) == fresh
+    assert poketcg._breaker.is_open
+
+    # Once open, requests are answered without reaching the upstream.
+    assert api._make_request("GET", "/sets", params=SETS_PARAMS) == fresh
+    assert stub.responses == {503: 2}
+
+
+def test_open_breaker_without_stale_data_raises(api, stub, monkeypatch):
+    monkeypatch.setattr(poketcg, "MAX_RETRIES", 0)
+    stub.inject_faults(Faults(outages=[(0, 60)]))
+
+    for _ in range(2):
+        with pytest.raises(PokemonTCGAPIError):
+            api.get_cards_by_set_id("set0")
+    assert poketcg._breaker.is_open
+
+    with pytest.raises(PokemonTCGAPIError, match="circuit open"):
+        api.get_cards_by_set_id("set1")
+    assert stub.responses == {503: 2}
+
+
+def test_autocomplete_gives_up_at_deadline_on_slow_upstream(api, stub, monkeypatch):
+    monkeypatch.setattr(poketcg, "_breaker", CircuitBreaker(1, reset_timeout=60))
+    monkeypatch.setitem(poketcg.REQUEST_DEADLINE, Priority.AUTOCOMPLETE, 0.3)
+    stub.latency = 1.0
+
+    start = time.monotonic()
+    with pytest.raises(PokemonTCGAPIError):
+        api.get_sets(Priority.AUTOCOMPLETE)
+
+    assert time.monotonic() - start < 1.0
+    # A slow upstream is not a failing one.
+    assert not poketcg._breaker.is_open
+
+
+def test_timeouts_at_the_full_request_timeout_open_the_breaker(api, stub, monkeypatch):
+    monkeypatch.setattr(poketcg, "_breaker", CircuitBreaker(1, reset_timeout=60))
+    monkeypatch.setattr(poketcg, "MAX_RETRIES", 0)
+    monkeypatch.setattr(poketcg, "REQUEST_TIMEOUT", 0.2)
+    stub.latency = 1.0
+
+    with pytest.raises(PokemonTCGAPIError):
+        api.get_sets(Priority.BACKGROUND)
+
+    assert poketcg._breaker.is_open
+
+
+def test_giving_up_on_retry_after_does_not_open_the_breaker(api, stub, monkeypatch):
+    monkeypatch.setattr(poketcg, "_breaker", CircuitBreaker(1, reset_timeout=60))
+    stub.inject_faults(Faults(retry_after=poketcg.MAX_RETRY_AFTER + 1, scripted=[429]))
+
+    start = time.monotonic()
+    with pytest.raises(PokemonTCGAPIError, match="HTTP 429"):
+        api.get_sets()
+
+    assert time.monotonic() - start < 1.0
+    assert stub.responses == {429: 1}
+    assert not poketcg._breaker.is_open
+
+
+def test_token_bucket_serves_autocomplete_before_agent():
+    bucket = TokenBucket(rate=5, capacity=1)
+    assert bucket.acquire(Priority.COMMAND)
+
+    order = []
+
+    def wait_for_token(priority: Priority):
+        bucket.acquire(priority)
+        order.append(priority)
+
+    agents = [
+        threading.Thread(target=wait_for_token, args=(Priority.AGENT,))
+        for _ in range(2)
+    ]
+    for thread in agents:
+        thread.start()
+    time.sleep(0.05)
+
+    autocompletes = [
+        threading.Thread(target=wait_for_token, args=(Priority.AUTOCOMPLETE,))
+        for _ in range(2)
+    ]
+    for thread in autocompletes:
+        thread.start()
+
+    for thread in agents + autocompletes:
+        thread.join()
+
+    assert order == [Priority.AUTOCOMPLETE] * 2 + [Priority.AGENT] * 2
+
+
+def test_token_bucket_times_out_without_tokens():
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    assert bucket.acquire(Priority.AGENT)
+    assert not bucket.acquire(Priority.AGENT, timeout=0.1)
+
+
+def test_to_lane_thread_runs_in_lane_with_context():
+    request = contextvars.ContextVar("request")
+
+    def current() -> tuple[str, str]:
+        return threading.current_thread().name, request.get()
+
+    async def call(name: str) -> tuple[str, str]:
+        request.set(name)
+        return await to_lane_thread(Priority.AGENT, current)
+
+    async def main():
+        return await asyncio.gather(*(call(name) for name in "abc"))
+
+    results = asyncio.run(main())
+
+    assert [name for _, name in results] == ["a", "b", "c"]
+    assert all(thread.startswith("poketcg-agent") for thread, _ in results)
+
+
+def test_run_in_lane_passes_the_lane_priority(api, stub):
+    sets = asyncio.run(run_in_lane(Priority.AUTOCOMPLETE, api.get_sets))
+
+    assert sets == stub.sets
@@ -0,0 +1,215 @@
+import math
+
+import pandas as pd
+import pytest
+
+from bot.prices import (
+    PriceTable,
+    build_price_frame,
+    pack_expected_value,
+    value_collection,
+)
+
+
+def _card(
+    card_id: str,
+    set_id: str = "base1",
+    rarity: str = "Common",
+    tcgplayer: dict | None = None,
+    cardmarket: dict | None = None,
+) -> dict:
+    card = {
+        "id": card_id,
+        "name": f"Card {card_id}",
+        "rarity": rarity,
+        "set": {"id": set_id, "name": f"Set {set_id}"},
+    }
+    if tcgplayer is not None:
+        card["tcgplayer"] = {"prices": tcgplayer}
+    if cardmarket is not None:
+        card["cardmarket"] = {"prices": cardmarket}
+    return card
+
+
+def _price(card: dict) -> float:
+    return build_price_frame([card])["price"].iloc[0]
+
+
+def test_price_prefers_tcgplayer_variants_in_order():
+    card = _card(
+        "a",
+        tcgplayer={
+            "holofoil": {"market": 9.0},
+            "normal": {"market": 1.5},
+        },
+        cardmarket={"trendPrice": 4.0},
+    )
+
+    assert _price(card) == 1.5
+
+
+def test_price_falls_back_from_market_to_mid():
+    card = _card("a", tcgplayer={"normal": {"market": None, "mid": 2.0}})
+
+    assert _price(card) == 2.0
+
+
+def test_price_skips_variants_without_prices():
+    card = _card(
+        "a",
+        tcgplayer={
+            "unlimitedHolofoil": {"market": 7.0},
+            "normal": {"low": 0.1},
+            "holofoil": {"mid": 3.0},
+        },
+    )
+
+    assert _price(card) == 3.0
+
+
+def test_price_uses_unknown_variants_after_known_ones():
+    card = _card("a", tcgplayer={"unlimitedHolofoil": {"market": 7.0}})
+
+    assert _price(card) == 7.0
+
+
+def test_price_falls_back_to_cardmarket():
+    assert _price(_card("a", cardmarket={"trendPrice": 4.0})) == 4.0
+    assert (
+        _price(_card("a", cardmarket={"trendPrice": None, "averageSellPrice": 3.5}))
+        == 3.5
+    )
+
+
+def test_price_is_missing_without_prices():
+    assert math.isnan(_price(_card("a")))
+    assert math.isnan(_price(_card("a", tcgplayer={"normal": {}}, cardmarket={})))
+
+
+def test_build_price_frame_indexes_unique_cards():
+    frame = build_price_frame(
+        [
+            _card("a", tcgplayer={"normal": {"market": 1.0}}),
+            _card("a", tcgplayer={"normal": {"market": 2.0}}),
+            _card("b"),
+        ]
+    )
+
+    assert list(frame.index) == ["a", "b"]
+    assert frame.loc["a", "price"] == 1.0
+    assert frame.loc["a", "set_name"] == "Set base1"
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    return build_price_frame(
+        [
+            _card("c1", rarity="Common", tcgplayer={"normal": {"market": 1.0}}),
+            _card("c2", rarity="Common", tcgplayer={"normal": {"market": 3.0}}),
+            _card("c3", rarity="Common"),
+            _card("u1", rarity="Uncommon", tcgplayer={"normal": {"market": 2.0}}),
+            _card("r1", rarity="Rare Holo", tcgplayer={"holofoil": {"market": 10.0}}),
+            _card("r2", rarity="Rare", cardmarket={"trendPrice": 20.0}),
+            _card("j1", "jungle", tcgplayer={"normal": {"market": 0.5}}),
+            _card("j2", "jungle", rarity="Uncommon"),
+        ]
+    )
+
+
+def test_value_collection_totals(prices):
+    collection = pd.DataFrame(
+        [("c1", 3), ("r1", 1), ("c3", 2), ("missing", 1), ("j1", 4)],
+        columns=["card_id", "count"],
+    )
+
+    value = value_collection(collection, prices)
+
+    assert value.total == pytest.approx(3 * 1.0 + 10.0 + 4 * 0.5)
+    assert value.card_count == 11
+    # Copies of cards without a price, including ones not in the price table.
+    assert value.unpriced_count == 3
+
+
+def test_value_collection_top_cards_skip_unpriced(prices):
+    collection = pd.DataFrame(
+        [("c1", 3), ("r1", 1), ("c3", 2), ("j1", 4)],
+        columns=["card_id", "count"],
+    )
+
+    value = value_collection(collection, prices, top_n=2)
+
+    assert list(value.top_cards["card_id"]) == ["r1", "c1"]
+    assert list(value.top_cards["value"]) == [10.0, 3.0]
+
+
+def test_value_collection_groups_by_set(prices):
+    collection = pd.DataFrame(
+        [("c1", 3), ("r1", 1), ("j1", 4), ("j2", 1)],
+        columns=["card_id", "count"],
+    )
+
+    value = value_collection(collection, prices)
+
+    assert value.by_set.to_dict() == {"Set base1": 13.0, "Set jungle": 2.0}
+    assert list(value.by_set.index) == ["Set base1", "Set jungle"]
+
+
+def test_pack_expected_value_averages_priced_cards_per_rarity(prices):
+    value = pack_expected_value(prices, "base1")
+
+    # Common averages c1 and c2 only; c3 has no price rather than $0.
+    assert value.by_rarity.to_dict() == {
+        "Common": 4 * 2.0,
+        "Uncommon": 3 * 2.0,
+        "Rare": 3 * 15.0,
+    }
+    assert value.total == pytest.approx(8.0 + 6.0 + 45.0)
+    assert value.card_count == 6
+    assert value.unpriced_count == 1
+
+
+def test_pack_expected_value_without_priced_cards_in_a_rarity(prices):
+    value = pack_expected_value(prices, "jungle")
+
+    assert value.by_rarity.to_dict() == {"Common": 2.0, "Uncommon": 0.0, "Rare": 0.0}
+    assert value.total == 2.0
+    assert value.card_count == 2
+    assert value.unpriced_count == 1
+
+
+def test_pack_expected_value_of_unknown_set(prices):
+    value = pack_expected_value(prices, "missing")
+
+    assert value.total == 0
+    assert value.card_count == 0
+
+
+class _FakeAPI:
+    def __init__(self, cards: list[dict]):
+        self.cards = cards
+
+    def get_cards_page(self, select: str, page: int, page_size: int) -> dict:
+        start = (page - 1) * page_size
+        return {
+            "data": self.cards[start : start + page_size],
+            "totalCount": len(self.cards),
+        }
+
+
+def test_price_table_refreshes_and_loads(tmp_path):
+    cards = [
+        _card(f"c{i}", tcgplayer={"normal": {"market": float(i)}}) for i in range(5)
+    ]
+    path = str(tmp_path / "prices.pkl")
+
+    table = PriceTable(path)
+    assert table.is_stale(3600)
+    assert not table.load()
+
+    table.refresh(_FakeAPI(cards))
+    assert not table.is_stale(3600)
+    assert len(table.frame) == 5
+
+    loaded = PriceTable(path)
+    assert loaded.load()
+    pd.testing.assert_frame_equal(loaded.frame, table.frame)
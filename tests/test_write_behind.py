@@ -0,0 +1,183 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import bot.write_behind
+from bot.database import metadata, player_cards, write_behind_flushes
+from bot.write_behind import WriteBehindBuffer
+
+
+@pytest.fixture
+def session(monkeypatch):
+    # SQLite accepts the same ON CONFLICT upserts the buffer sends to Postgres.
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    metadata.create_all(engine)
+    session = sessionmaker(bind=engine)
+    monkeypatch.setattr(bot.write_behind, "Session", session)
+    return session
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.sqlite3")
+
+
+@pytest.fixture
+def buffer(session, journal_path):
+    buffer = WriteBehindBuffer(journal_path, flush_size=3)
+    buffer.recover()
+    yield buffer
+    buffer.close()
+
+
+def _read_rows(session, user_id: str):
+    def read_rows():
+        with session.begin() as s:
+            return s.execute(
+                select(player_cards.c.card_id, player_cards.c.count).where(
+                    player_cards.c.discord_id == user_id
+                )
+            ).fetchall()
+
+    return read_rows
+
+
+def _cards(buffer, session, user_id: str) -> dict[str, int]:
+    return dict(buffer.merge_player_cards(user_id, _read_rows(session, user_id)))
+
+
+def _insert_cards(session, rows: list[tuple[str, str, int]]):
+    with session.begin() as s:
+        s.execute(
+            player_cards.insert(),
+            [
+                {"discord_id": discord_id, "card_id": card_id, "count": count}
+                for discord_id, card_id, count in rows
+            ],
+        )
+
+
+def test_pending_cards_are_merged_with_flushed_ones(buffer, session):
+    _insert_cards(session, [("1", "a", 2), ("1", "b", 1)])
+    buffer.append("1", ["a", "c", "c"])
+    buffer.append("2", ["a"])
+
+    assert _cards(buffer, session, "1") == {"a": 3, "b": 1, "c": 2}
+    assert _cards(buffer, session, "2") == {"a": 1}
+    assert _cards(buffer, session, "3") == {}
+
+
+def test_should_flush_at_flush_size(buffer):
+    buffer.append("1", ["a", "b"])
+    assert not buffer.should_flush()
+
+    buffer.append("1", ["c"])
+    assert buffer.should_flush()
+
+
+def test_flush_upserts_counts_and_clears_pending(buffer, session):
+    _insert_cards(session, [("1", "a", 2)])
+    buffer.append("1", ["a", "a", "b"])
+    buffer.append("2", ["b"])
+
+    assert buffer.flush() == 3
+    assert buffer.flush() == 0
+    assert not buffer.should_flush()
+    assert _cards(buffer, session, "1") == {"a": 4, "b": 1}
+    assert _cards(buffer, session, "2") == {"b": 1}
+
+    with session.begin() as s:
+        last_entry_id = s.execute(
+            select(write_behind_flushes.c.last_entry_id).where(
+                write_behind_flushes.c.journal_id == buffer.journal_id
+            )
+        ).scalar()
+    assert last_entry_id == 4
+
+
+@pytest.mark.parametrize("flush_during_read", [True, False])
+def test_read_racing_a_flush_counts_cards_once(buffer, session, flush_during_read):
+    buffer.append("1", ["a", "a"])
+    read_rows = _read_rows(session, "1")
+    reads = []
+
+    def racing_read_rows():
+        # The first read sees Postgres from before the flush committed and
+        # the second, if any, from after.
+        rows = read_rows()
+        if not reads and flush_during_read:
+            buffer.flush()
+        reads.append(rows)
+        return rows
+
+    assert dict(buffer.merge_player_cards("1", racing_read_rows)) == {"a": 2}
+    assert len(reads) == (2 if flush_during_read else 1)
+
+
+def test_failed_flush_keeps_cards_pending(buffer, session, monkeypatch):
+    buffer.append("1", ["a"])
+
+    def fail(*args):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(buffer, "_commit", fail)
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+
+    assert _read_rows(session, "1")() == []
+    assert _cards(buffer, session, "1") == {"a": 1}
+
+    monkeypatch.delattr(buffer, "_commit")
+    assert buffer.flush() == 1
+    assert dict(_read_rows(session, "1")()) == {"a": 1}
+    assert _cards(buffer, session, "1") == {"a": 1}
+
+
+def test_recover_replays_unflushed_entries(session, journal_path):
+    buffer = WriteBehindBuffer(journal_path, flush_size=100)
+    buffer.recover()
+    buffer.append("1", ["a", "b"])
+    buffer.append("1", ["b"])
+    journal_id = buffer.journal_id
+    buffer.close()
+
+    reopened = WriteBehindBuffer(journal_path, flush_size=100)
+    reopened.recover()
+    assert reopened.journal_id == journal_id
+    assert _cards(reopened, session, "1") == {"a": 1, "b": 2}
+
+    assert reopened.flush() == 2
+    assert dict(_read_rows(session, "1")()) == {"a": 1, "b": 2}
+    assert _cards(reopened, session, "1") == {"a": 1, "b": 2}
+    reopened.close()
+
+
+def test_recover_skips_entries_committed_before_a_crash(session, journal_path):
+    buffer = WriteBehindBuffer(journal_path, flush_size=100)
+    buffer.recover()
+    buffer.append("1", ["a", "b"])
+    buffer.append("1", ["c"])
+
+    # A flush of the first two entries committed, then the bot died before
+    # removing them from the journal.
+    _insert_cards(session, [("1", "a", 1), ("1", "b", 1)])
+    with session.begin() as s:
+        s.execute(
+            write_behind_flushes.insert().values(
+                journal_id=buffer.journal_id, last_entry_id=2
+            )
+        )
+    buffer.close()
+
+    reopened = WriteBehindBuffer(journal_path, flush_size=100)
+    reopened.recover()
+    assert _cards(reopened, session, "1") == {"a": 1, "b": 1, "c": 1}
+
+    assert reopened.flush() == 1
+    assert dict(_read_rows(session, "1")()) == {"a": 1, "b": 1, "c": 1}
+    reopened.close()